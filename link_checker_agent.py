@@ -7,12 +7,21 @@ Crawls a website and generates a report on broken/inactive links
 import asyncio
 import aiohttp
 import logging
+import random
+import re
 from datetime import datetime
-from urllib.parse import urljoin, urlparse
-from collections import defaultdict
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from collections import defaultdict, Counter
+from dataclasses import dataclass, field
+from typing import Optional
 import json
 from pathlib import Path
-from bs4 import BeautifulSoup
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from selectolax.lexbor import LexborHTMLParser
 import time
 
 # Configure logging
@@ -22,6 +31,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Don't download/parse pages bigger than this; they're not worth crawling
+_MAX_PAGE_BYTES = 5_000_000
+
+# One C-level match replaces a chain of Python startswith checks per href
+_SKIP_RE = re.compile(r'^(?:#|javascript:|mailto:|data:|tel:|ftp:)').match
+
+# Only these outcomes are worth retrying; a hard 404 won't change next time
+_RETRY_STATUSES = {429, 502, 503, 504}
+_RETRYABLE_ERRORS = (aiohttp.ClientConnectorError, aiohttp.ServerDisconnectedError)
+
+
+def _backoff_delay(attempt):
+    """Exponential backoff with jitter so retries don't hammer a struggling host"""
+    return 0.25 * (2 ** attempt) + random.uniform(0, 0.25)
+
+
+def _normalize_url(url):
+    """Normalize a URL so trivially different duplicates collapse to one key
+
+    Strips the fragment, lowercases scheme and host, and sorts query
+    parameters. Using the same key on write and lookup means each distinct
+    target is HEAD-checked only once. The trailing slash is kept: /page and
+    /page/ are different resources on exact-match servers, and the key is
+    also the URL we issue the status check against.
+    """
+    # Fast path: most URLs arrive already normalized, and a couple of linear
+    # scans are far cheaper than urlsplit plus a full rebuild
+    if '#' not in url and '?' not in url:
+        sep = url.find('//')
+        if sep != -1:
+            host_end = url.find('/', sep + 2)
+            prefix = url[:host_end] if host_end != -1 else url
+            if prefix.islower():
+                return url
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        # Malformed hrefs (e.g. a stray '[' reads as a bad IPv6 host) come
+        # straight from crawled pages; never let one break the crawl
+        return url
+    query = parts.query
+    if query:
+        query = urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+
+@dataclass(slots=True)
+class LinkRecord:
+    """Per-URL tracking record; slots keep tens of thousands of these compact
+
+    pages is a set so a nav-bar link repeated on every page records each page
+    once; count tracks total occurrences separately.
+    """
+    status: Optional[int] = None
+    pages: set = field(default_factory=set)
+    count: int = 0
+    error: Optional[str] = None
+
 
 class LinkCheckerAgent:
     def __init__(self, base_url, max_retries=3, timeout=10, max_concurrent=5):
@@ -36,160 +104,293 @@ class LinkCheckerAgent:
         """
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
+        # Precomputed so the per-link domain check is a cheap prefix compare
+        # instead of a full urlparse of every URL. Requiring /, ?, or # right
+        # after the domain stops example.com matching example.com.evil.com or
+        # example.com:8080; bare-root URLs are matched by exact equality
+        self._domain_prefixes = tuple(
+            scheme + self.domain + sep
+            for scheme in ('http://', 'https://')
+            for sep in ('/', '?', '#')
+        )
+        self._domain_roots = ('http://' + self.domain, 'https://' + self.domain)
         self.max_retries = max_retries
         self.timeout = timeout
         self.max_concurrent = max_concurrent
         
-        # Track visited pages and links
+        # Track visited pages and links; queued guards against enqueueing the
+        # same URL twice so no dequeue-side re-check is needed
         self.visited_pages = set()
-        self.to_visit = {base_url}
-        self.all_links = defaultdict(lambda: {"status": None, "pages": [], "error": None})
+        self.queued = {base_url}
+        self.all_links = {}
         self.pages_scanned = 0
+        self.links_checked = 0
         self.session = None
+
+        # Per-domain circuit breaker: after enough consecutive failures on a
+        # netloc, stop paying max_retries * timeout for every link on it
+        self.domain_failures = defaultdict(int)
+        self.domain_dead = set()
+        self.domain_failure_threshold = 5
         self.semaphore = asyncio.Semaphore(max_concurrent)
         
     async def fetch_page(self, url):
-        """Fetch a page with retry logic"""
-        async with self.semaphore:
-            for attempt in range(self.max_retries):
-                try:
-                    async with self.session.get(url, timeout=self.timeout, allow_redirects=True) as response:
-                        if response.status == 200:
-                            return await response.text()
-                        else:
+        """Fetch a page with retry logic (concurrency is owned by the crawl worker pool)"""
+        for attempt in range(self.max_retries):
+            try:
+                async with self.session.get(url, timeout=self.timeout, allow_redirects=True) as response:
+                    if response.status != 200:
+                        # Only transient statuses are worth another attempt
+                        if response.status not in _RETRY_STATUSES or attempt == self.max_retries - 1:
                             return None
-                except asyncio.TimeoutError:
-                    logger.warning(f"Timeout on {url} (attempt {attempt + 1}/{self.max_retries})")
-                    if attempt == self.max_retries - 1:
+                        await asyncio.sleep(_backoff_delay(attempt))
+                        continue
+
+                    # Only HTML is worth handing to the parser; skip PDFs,
+                    # images, JSON, etc. without downloading their bodies
+                    content_type = response.headers.get('Content-Type', '')
+                    if not content_type.startswith(('text/html', 'application/xhtml')):
                         return None
-                except Exception as e:
-                    logger.warning(f"Error fetching {url}: {e}")
-                    if attempt == self.max_retries - 1:
+                    if int(response.headers.get('Content-Length') or 0) > _MAX_PAGE_BYTES:
                         return None
-                await asyncio.sleep(0.5)
+
+                    # Read in chunks with a hard cap in case Content-Length lied
+                    chunks = []
+                    size = 0
+                    async for chunk in response.content.iter_chunked(65536):
+                        size += len(chunk)
+                        if size > _MAX_PAGE_BYTES:
+                            logger.warning(f"Skipping {url}: body exceeds {_MAX_PAGE_BYTES} bytes")
+                            return None
+                        chunks.append(chunk)
+                    return b''.join(chunks).decode(response.charset or 'utf-8', errors='replace')
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout on {url} (attempt {attempt + 1}/{self.max_retries})")
+                if attempt == self.max_retries - 1:
+                    return None
+            except _RETRYABLE_ERRORS as e:
+                logger.warning(f"Error fetching {url}: {e}")
+                if attempt == self.max_retries - 1:
+                    return None
+            except Exception as e:
+                # Anything else (bad URL, SSL failure, ...) won't heal on retry
+                logger.warning(f"Error fetching {url}: {e}")
+                return None
+            await asyncio.sleep(_backoff_delay(attempt))
         return None
 
     async def check_link_status(self, url):
         """Check if a link is active"""
+        netloc = urlsplit(url).netloc
+        if netloc in self.domain_dead:
+            return None
+
         async with self.semaphore:
             for attempt in range(self.max_retries):
+                # Re-check every attempt: all check tasks start before any
+                # failure is recorded, so the breaker usually trips while a
+                # task is waiting on the semaphore or sleeping between retries
+                if netloc in self.domain_dead:
+                    return None
                 try:
-                    async with self.session.head(url, timeout=self.timeout, allow_redirects=True) as response:
-                        return response.status
+                    # A 3xx already proves the link is alive; don't spend
+                    # round-trips chasing the redirect chain
+                    async with self.session.head(url, timeout=self.timeout, allow_redirects=False) as response:
+                        status = response.status
+                    if status in (405, 501):
+                        # Server rejects HEAD; a ranged GET checks liveness
+                        # without downloading the body
+                        async with self.session.get(url, timeout=self.timeout, allow_redirects=False,
+                                                    headers={'Range': 'bytes=0-0'}) as response:
+                            status = response.status
+                    # The server answered, so the domain itself is healthy
+                    self.domain_failures[netloc] = 0
+                    if status in _RETRY_STATUSES and attempt < self.max_retries - 1:
+                        await asyncio.sleep(_backoff_delay(attempt))
+                        continue
+                    return status
                 except asyncio.TimeoutError:
                     if attempt == self.max_retries - 1:
+                        self._record_domain_failure(netloc)
                         return 408  # Request timeout status
-                except Exception as e:
+                except _RETRYABLE_ERRORS:
                     if attempt == self.max_retries - 1:
+                        self._record_domain_failure(netloc)
                         return None
-                await asyncio.sleep(0.5)
+                except Exception:
+                    # Non-transient failure; retrying won't change the answer
+                    self._record_domain_failure(netloc)
+                    return None
+                await asyncio.sleep(_backoff_delay(attempt))
         return None
 
+    def _record_domain_failure(self, netloc):
+        """Count a failed check against its domain and trip the breaker if needed"""
+        self.domain_failures[netloc] += 1
+        if self.domain_failures[netloc] >= self.domain_failure_threshold and netloc not in self.domain_dead:
+            self.domain_dead.add(netloc)
+            logger.warning(f"Domain {netloc} marked dead after {self.domain_failures[netloc]} failures; skipping its remaining links")
+
     def extract_links(self, page_url, html_content):
         """Extract all links from a page"""
         links = {"internal": [], "external": []}
-        
-        try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            for tag in soup.find_all(['a', 'link', 'script', 'img']):
-                href = tag.get('href') or tag.get('src')
-                if not href:
-                    continue
-                
-                # Skip certain links
-                if href.startswith('#') or href.startswith('javascript:') or href.startswith('mailto:'):
-                    continue
-                
-                # Convert relative URLs to absolute
+
+        # Parse the page URL once instead of once per href inside urljoin
+        base_parsed = urlsplit(page_url)
+        base_root = f"{base_parsed.scheme}://{base_parsed.netloc}"
+
+        # lexbor's C parser tolerates malformed HTML, so no try/except needed
+        tree = LexborHTMLParser(html_content)
+
+        for node in tree.css('a[href], link[href], script[src], img[src]'):
+            href = node.attributes.get('href') or node.attributes.get('src')
+            if not href:
+                continue
+
+            # Skip certain links
+            if _SKIP_RE(href):
+                continue
+
+            # Convert relative URLs to absolute (fast paths for the common
+            # forms, urljoin only for relative paths)
+            if href.startswith(('http://', 'https://')):
+                absolute_url = href
+            elif href.startswith('//'):
+                absolute_url = f"{base_parsed.scheme}:{href}"
+            elif href.startswith('/'):
+                absolute_url = base_root + href
+            else:
                 absolute_url = urljoin(page_url, href)
-                
-                # Categorize links
-                if urlparse(absolute_url).netloc == self.domain:
-                    links["internal"].append(absolute_url)
-                else:
-                    links["external"].append(absolute_url)
-        
-        except Exception as e:
-            logger.error(f"Error parsing {page_url}: {e}")
-        
+
+            # Categorize links
+            if absolute_url.startswith(self._domain_prefixes) or absolute_url in self._domain_roots:
+                links["internal"].append(absolute_url)
+            else:
+                links["external"].append(absolute_url)
+
         return links
 
     async def crawl_page(self, url):
-        """Crawl a single page"""
+        """Crawl a single page and return newly discovered internal links"""
         if url in self.visited_pages:
-            return
-        
+            return []
+
         logger.info(f"Crawling: {url}")
         self.visited_pages.add(url)
         self.pages_scanned += 1
-        
+
         # Fetch the page
         html = await self.fetch_page(url)
         if not html:
             logger.warning(f"Could not fetch {url}")
-            return
-        
+            return []
+
         # Extract links
         links = self.extract_links(url, html)
-        
-        # Track all links found on this page
-        for link in links["internal"] + links["external"]:
-            self.all_links[link]["pages"].append(url)
-        
-        # Add internal links to crawl queue
+
+        # Track all links found on this page, keyed by normalized URL so
+        # fragment/slash/query-order variants share one record. Counting
+        # per-page first dedupes repeated links (nav bars, footers) before
+        # they touch the shared records.
+        for link, occurrences in Counter(links["internal"] + links["external"]).items():
+            record = self.all_links.setdefault(_normalize_url(link), LinkRecord())
+            record.pages.add(url)
+            record.count += occurrences
+
+        # Collect internal links for the crawl queue
+        new_links = []
         for internal_link in links["internal"]:
-            if internal_link not in self.visited_pages and len(self.visited_pages) < 1000:  # Limit crawl
-                self.to_visit.add(internal_link)
+            if internal_link not in self.queued and len(self.visited_pages) < 1000:  # Limit crawl
+                self.queued.add(internal_link)
+                new_links.append(internal_link)
+        return new_links
+
+    async def run(self):
+        """Crawl the site and check all links over one shared HTTP session
+
+        Keeping a single session (and connector) alive across both phases
+        preserves keep-alive connections and the DNS cache, so link checking
+        doesn't re-handshake hosts the crawl already talked to.
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrent * 8,
+            limit_per_host=self.max_concurrent,
+            use_dns_cache=True,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        # Ask for compressed bodies; aiohttp auto-decompresses them for us
+        async with aiohttp.ClientSession(
+            connector=connector,
+            auto_decompress=True,
+            headers={'Accept-Encoding': 'gzip, br'},
+        ) as session:
+            self.session = session
+            await self.crawl_site()
+            await self.check_all_links()
 
     async def crawl_site(self):
-        """Crawl the entire site"""
+        """Crawl the entire site with a pool of concurrent workers"""
+        if self.session is None:
+            raise RuntimeError("No active session; call run() instead of crawl_site() directly")
+
         logger.info(f"Starting crawl of {self.base_url}")
-        
-        connector = aiohttp.TCPConnector(limit_per_host=self.max_concurrent)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            self.session = session
-            
-            while self.to_visit:
-                url = self.to_visit.pop()
-                if url not in self.visited_pages:
-                    await self.crawl_page(url)
-                
-                # Progress update
-                if self.pages_scanned % 10 == 0:
-                    logger.info(f"Progress: {self.pages_scanned} pages scanned, {len(self.all_links)} unique links found")
-        
+
+        queue = asyncio.Queue()
+        queue.put_nowait(self.base_url)
+
+        async def worker():
+            while True:
+                url = await queue.get()
+                try:
+                    # The queued set guarantees each URL is enqueued once, so
+                    # no visited re-check is needed here
+                    for link in await self.crawl_page(url):
+                        queue.put_nowait(link)
+
+                    # Progress update
+                    if self.pages_scanned % 10 == 0:
+                        logger.info(f"Progress: {self.pages_scanned} pages scanned, {len(self.all_links)} unique links found")
+                except Exception as e:
+                    # A page that blows up must not kill the worker: with all
+                    # workers dead, queue.join() would wait forever
+                    logger.error(f"Error crawling {url}: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrent)]
+        await queue.join()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
         logger.info(f"Crawl complete: {self.pages_scanned} pages, {len(self.all_links)} unique links")
 
     async def check_all_links(self):
         """Check the status of all discovered links"""
+        if self.session is None:
+            raise RuntimeError("No active session; call run() instead of check_all_links() directly")
+
         logger.info(f"Checking status of {len(self.all_links)} links...")
-        
-        connector = aiohttp.TCPConnector(limit_per_host=self.max_concurrent)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            self.session = session
-            
-            tasks = []
-            for link in self.all_links.keys():
-                tasks.append(self._check_link_with_tracking(link))
-            
-            # Process in batches
-            for i in range(0, len(tasks), self.max_concurrent):
-                batch = tasks[i:i + self.max_concurrent]
-                await asyncio.gather(*batch)
-                
-                if i % (self.max_concurrent * 5) == 0:
-                    logger.info(f"Status check progress: {i}/{len(tasks)} links checked")
-        
+
+        # Submit everything at once; the semaphore in check_link_status
+        # bounds concurrency, so a slow link never stalls a whole batch
+        tasks = [self._check_link_with_tracking(link) for link in self.all_links]
+        await asyncio.gather(*tasks, return_exceptions=True)
+
         logger.info("Link status check complete")
 
     async def _check_link_with_tracking(self, link):
         """Check link status and track result"""
         try:
             status = await self.check_link_status(link)
-            self.all_links[link]["status"] = status
+            self.all_links[link].status = status
         except Exception as e:
-            self.all_links[link]["error"] = str(e)
+            self.all_links[link].error = str(e)
+        finally:
+            self.links_checked += 1
+            if self.links_checked % 50 == 0:
+                logger.info(f"Status check progress: {self.links_checked}/{len(self.all_links)} links checked")
 
     def generate_report(self, output_file="link_report.json"):
         """Generate a comprehensive report of broken links"""
@@ -212,20 +413,22 @@ class LinkCheckerAgent:
             "active_links_sample": [],  # Sample of working links
         }
         
-        for link, data in self.all_links.items():
-            status = data["status"]
-            pages = data["pages"]
-            
+        for link, record in self.all_links.items():
+            status = record.status
+
+            found_on_pages = sorted(record.pages)[:5]  # Limit to 5 pages
             link_info = {
                 "url": link,
                 "status": status,
-                "found_on_pages": pages[:5],  # Limit to first 5 pages
-                "total_occurrences": len(pages),
+                "found_on_pages": found_on_pages,
+                # Precomputed so the HTML renderer needs no per-row branching
+                "found_first": found_on_pages[0] if found_on_pages else "N/A",
+                "total_occurrences": record.count,
             }
             
             if status is None:
                 report["summary"]["error_links"] += 1
-                link_info["error"] = data.get("error", "Unknown error")
+                link_info["error"] = record.error or "Unknown error"
                 report["error_links"].append(link_info)
             elif status == 404:
                 report["summary"]["broken_links"] += 1
@@ -233,7 +436,7 @@ class LinkCheckerAgent:
             elif status >= 400:
                 report["summary"]["inactive_links"] += 1
                 report["inactive_links"].append(link_info)
-            elif status == 200:
+            elif 200 <= status < 400:  # 2xx and redirects both count as alive
                 report["summary"]["active_links"] += 1
                 if len(report["active_links_sample"]) < 20:
                     report["active_links_sample"].append(link_info)
@@ -245,9 +448,13 @@ class LinkCheckerAgent:
         report["inactive_links"].sort(key=lambda x: x["total_occurrences"], reverse=True)
         report["error_links"].sort(key=lambda x: x["total_occurrences"], reverse=True)
         
-        # Save report
-        with open(output_file, 'w') as f:
-            json.dump(report, f, indent=2)
+        # Save report (orjson's C encoder is much faster for large link dicts)
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_file, 'w') as f:
+                json.dump(report, f, indent=2)
         
         logger.info(f"Report saved to {output_file}")
         return report
@@ -294,13 +501,10 @@ async def main():
     
     agent = LinkCheckerAgent(target_url)
     
-    # Step 1: Crawl the site
+    # Step 1 & 2: Crawl the site and check all links over one session
     print(f"\nStarting link checker for: {target_url}")
-    await agent.crawl_site()
-    
-    # Step 2: Check all links
-    await agent.check_all_links()
-    
+    await agent.run()
+
     # Step 3: Generate report
     report = agent.generate_report()
     agent.print_report_summary(report)